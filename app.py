@@ -0,0 +1,745 @@
+import functools
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import (
+    Flask,
+    g,
+    render_template,
+    request,
+    redirect,
+    has_request_context,
+    make_response,
+    session,
+    stream_template,
+    stream_with_context,
+    url_for,
+    flash,
+    abort,
+)
+from flask_caching import Cache
+from flask_compress import Compress
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import (
+    LoginManager,
+    UserMixin,
+    login_user,
+    logout_user,
+    login_required,
+    current_user,
+)
+import sqlite3
+
+import orjson
+import xxhash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from sqlalchemy import bindparam, event, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import defer, raiseload, selectinload
+from werkzeug.security import check_password_hash
+
+def _load_or_create_secret_key(path):
+    """Read the signing key from disk, generating it on first run.
+
+    A key generated at import time (os.urandom) would differ per WSGI
+    worker and invalidate every session that lands on another worker.
+    """
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        pass
+    key = os.urandom(24)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker won the create race; use its key so all
+        # workers sign with the same one.
+        with open(path, 'rb') as fh:
+            return fh.read()
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(key)
+    return key
+
+
+app = Flask(__name__)
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or _load_or_create_secret_key(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.secret_key')
+)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///automart.db'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False},
+}
+
+# Response cache for the read-heavy anonymous pages. Redis when
+# configured (shared across workers), an in-process cache otherwise.
+if os.environ.get('REDIS_URL'):
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = os.environ['REDIS_URL']
+else:
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+# Dev/test guard rail: with AUTOMART_STRICT_LOADING set, any relationship
+# access a route forgot to eager-load raises instead of silently issuing
+# SQL, and every request logs its query count. SQL_ECHO prints the
+# statements themselves.
+app.config['STRICT_LOADING'] = bool(os.environ.get('AUTOMART_STRICT_LOADING'))
+app.config['SQLALCHEMY_ECHO'] = bool(os.environ.get('SQL_ECHO'))
+
+# Listing pages are large, highly repetitive HTML — they compress 5-10x.
+# Brotli level 4 is fast enough to run inline; gzip is the fallback.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_BR_LEVEL'] = 4
+
+db = SQLAlchemy(app)
+cache = Cache(app)
+Compress(app)
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets /browse reads proceed while a dealer write commits, and
+    # synchronous=NORMAL drops the per-commit fsync that journal_mode=
+    # DELETE forced. The mmap/cache pragmas keep hot pages in memory.
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-65536')
+    cursor.close()
+login_manager = LoginManager(app)
+login_manager.login_view = 'login'
+
+# argon2id with costs tuned for this server: ~64 MiB / 2 passes is far
+# cheaper per login than the previous werkzeug pbkdf2 default while
+# giving a better security margin.
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=2)
+
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    whatsapp_number = db.Column(db.String(32))
+    cars = db.relationship('Car', back_populates='dealer')
+
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+
+    def check_password(self, password):
+        if self.password_hash.startswith('$argon2'):
+            try:
+                password_hasher.verify(self.password_hash, password)
+            except VerifyMismatchError:
+                return False
+            if password_hasher.check_needs_rehash(self.password_hash):
+                self.password_hash = password_hasher.hash(password)
+            return True
+        # Legacy werkzeug hash: verify with the old scheme, then upgrade
+        # in place so the next login takes the argon2 path.
+        if check_password_hash(self.password_hash, password):
+            self.password_hash = password_hasher.hash(password)
+            return True
+        return False
+
+
+class Car(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    make = db.Column(db.String(80), nullable=False, index=True)
+    model = db.Column(db.String(80), nullable=False, index=True)
+    year = db.Column(db.Integer, nullable=False, index=True)
+    mileage = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
+    description = db.Column(db.Text)
+    image_url = db.Column(db.String(500))
+    is_sold = db.Column(db.Boolean, default=False, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    dealer = db.relationship('User', back_populates='cars')
+
+    # Composite indexes matching the hot query shapes: /browse filters on
+    # is_sold and orders by id desc; /dashboard filters on user_id and
+    # orders by (is_sold, id desc).
+    __table_args__ = (
+        db.Index('ix_car_sold_id', 'is_sold', 'id'),
+        db.Index('ix_car_user_sold_id', 'user_id', 'is_sold', 'id'),
+    )
+
+
+# Built once at import so every auth request reuses the same statement
+# object and its cached compilation, instead of rebuilding the Core tree
+# per call. The lookup itself is served by the unique username index.
+_USER_BY_NAME = select(User).where(User.username == bindparam('u')).limit(1)
+
+
+def user_by_username(username):
+    return db.session.execute(_USER_BY_NAME, {'u': username}).scalar_one_or_none()
+
+
+# Full-text index over the searchable car columns. The table is an
+# external-content FTS5 table backed by car, kept in sync by triggers so
+# it stays correct no matter how rows are written (ORM or raw SQL).
+_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS car_fts USING fts5(
+        make, model, description,
+        content='car', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_fts_ai AFTER INSERT ON car BEGIN
+        INSERT INTO car_fts(rowid, make, model, description)
+        VALUES (new.id, new.make, new.model, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_fts_ad AFTER DELETE ON car BEGIN
+        INSERT INTO car_fts(car_fts, rowid, make, model, description)
+        VALUES ('delete', old.id, old.make, old.model, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_fts_au AFTER UPDATE ON car BEGIN
+        INSERT INTO car_fts(car_fts, rowid, make, model, description)
+        VALUES ('delete', old.id, old.make, old.model, old.description);
+        INSERT INTO car_fts(rowid, make, model, description)
+        VALUES (new.id, new.make, new.model, new.description);
+    END
+    """,
+)
+
+
+def init_search_index():
+    existed = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='car_fts'")
+    ).first()
+    for ddl in _FTS_DDL:
+        db.session.execute(text(ddl))
+    if not existed:
+        # Car rows written before the triggers existed would otherwise
+        # never be searchable; rebuild repopulates from the content table.
+        db.session.execute(text("INSERT INTO car_fts(car_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def _fts_prefix_terms(column, value):
+    """Turn free-form user input into prefix terms for one FTS5 column."""
+    tokens = re.findall(r'\w+', value)
+    return [f'{column}:"{token}"*' for token in tokens]
+
+
+def search_car_ids(make, model):
+    """Return car ids matching the make/model terms, best match first."""
+    terms = _fts_prefix_terms('make', make) + _fts_prefix_terms('model', model)
+    if not terms:
+        return None
+    rows = db.session.execute(
+        text('SELECT rowid FROM car_fts WHERE car_fts MATCH :q ORDER BY bm25(car_fts)'),
+        {'q': ' AND '.join(terms)},
+    )
+    return [row[0] for row in rows]
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Runs on every authenticated request, and templates touch
+    # current_user repeatedly. Session.get hits the identity map before
+    # the database, and g caches the result for the rest of the request.
+    user_id = int(user_id)
+    user = getattr(g, '_cached_user', None)
+    if user is not None and user.id == user_id:
+        return user
+    user = db.session.get(User, user_id)
+    g._cached_user = user
+    return user
+
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _page_args():
+    """Keyset-pagination cursor: page after this id, at most this many rows."""
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    return after_id, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _next_page_url(endpoint, cars, limit, **view_args):
+    """URL for the next page, or None when this page wasn't full."""
+    if len(cars) < limit:
+        return None
+    args = request.args.to_dict()
+    args['after_id'] = cars[-1].id
+    return url_for(endpoint, **view_args, **args)
+
+
+def _loader_options(*options):
+    """Loader options for a query, plus raiseload('*') in strict mode.
+
+    Strict mode turns a lazy load someone reintroduces (say, a template
+    touching a relationship the route stopped eager-loading) into a loud
+    error instead of a silent N+1.
+    """
+    if app.config['STRICT_LOADING']:
+        return options + (raiseload('*'),)
+    return options
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_request_queries(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._query_count = getattr(g, '_query_count', 0) + 1
+
+
+@app.after_request
+def _log_request_queries(response):
+    if app.config['STRICT_LOADING']:
+        count = getattr(g, '_query_count', 0)
+        app.logger.info('%s %s: %d queries', request.method, request.path, count)
+    return response
+
+
+def _invalidate_car_cache(car_id):
+    # Cached view keys are 'view/' + request.path.
+    cache.delete(f'view//car/{car_id}')
+
+
+def _stream_page(rows, limit, cursor, endpoint, **view_args):
+    """Yield rows while tracking the keyset cursor for the next link.
+
+    The template's next-link block renders after the for loop, so the
+    cursor filled in here is visible once the page's rows have streamed.
+    """
+    count = 0
+    last_id = None
+    for car in rows:
+        last_id = car.id
+        count += 1
+        yield car
+    if count == limit and last_id is not None:
+        args = request.args.to_dict()
+        args['after_id'] = last_id
+        cursor['next_url'] = url_for(endpoint, **view_args, **args)
+
+
+# Columns the list views actually show; used by the JSON path so the
+# rows come straight off the cursor with no ORM hydration.
+_CAR_LIST_COLUMNS = (
+    Car.id,
+    Car.make,
+    Car.model,
+    Car.year,
+    Car.mileage,
+    Car.price,
+    Car.image_url,
+    Car.user_id,
+)
+
+
+def _browse_json(matched_ids, year, max_price, after_id, limit):
+    """API variant of /browse: Core rows serialized with orjson.
+
+    Skips ORM object construction and Jinja entirely — each result is a
+    plain row mapping turned into a dict.
+    """
+    stmt = select(*_CAR_LIST_COLUMNS).where(Car.is_sold == False)  # noqa: E712
+    if matched_ids is not None:
+        stmt = stmt.where(Car.id.in_(matched_ids))
+    if year:
+        stmt = stmt.where(Car.year == year)
+    if max_price:
+        stmt = stmt.where(Car.price <= max_price)
+    if after_id:
+        stmt = stmt.where(Car.id < after_id)
+    stmt = stmt.order_by(Car.id.desc()).limit(limit)
+    cars = [dict(row) for row in db.session.execute(stmt).mappings()]
+    next_after_id = cars[-1]['id'] if len(cars) == limit else None
+    return app.response_class(
+        orjson.dumps({'cars': cars, 'next_after_id': next_after_id}),
+        mimetype='application/json',
+    )
+
+
+@app.route('/browse')
+def browse_cars():
+    make = request.args.get('make', '').strip()
+    model = request.args.get('model', '').strip()
+    year = request.args.get('year', type=int)
+    max_price = request.args.get('max_price', type=float)
+    matched_ids = search_car_ids(make, model) if (make or model) else None
+    after_id, limit = _page_args()
+    if request.accept_mimetypes.best == 'application/json':
+        return _browse_json(matched_ids, year, max_price, after_id, limit)
+    # Dealer info is rendered on every card, so load it eagerly: one query
+    # for the cars plus one batched SELECT for their dealers, instead of a
+    # lazy SELECT per row. The description blob never shows on cards, so
+    # keep it out of the row entirely — narrower rows, more per page.
+    query = Car.query.options(
+        *_loader_options(selectinload(Car.dealer), defer(Car.description))
+    ).filter_by(is_sold=False)
+    if matched_ids is not None:
+        query = query.filter(Car.id.in_(matched_ids))
+    if year:
+        query = query.filter(Car.year == year)
+    if max_price:
+        query = query.filter(Car.price <= max_price)
+    if after_id:
+        query = query.filter(Car.id < after_id)
+    query = query.order_by(Car.id.desc()).limit(limit)
+    cursor = {}
+    if matched_ids:
+        # bm25 re-ordering needs the whole page in hand, so the search
+        # path materializes before rendering. The cursor is still the
+        # page's minimum id, computed before the relevance sort.
+        cars = query.all()
+        next_url = _next_page_url('browse_cars', cars, limit)
+        if next_url:
+            cursor['next_url'] = next_url
+        rank = {car_id: pos for pos, car_id in enumerate(matched_ids)}
+        cars.sort(key=lambda car: rank[car.id])
+        rows = iter(cars)
+    else:
+        rows = _stream_page(query.yield_per(100), limit, cursor, 'browse_cars')
+    # Stream the template so the first cards ship while later rows are
+    # still being fetched and rendered; peak memory stays O(chunk).
+    return app.response_class(
+        stream_with_context(stream_template('browse.html', cars=rows, cursor=cursor))
+    )
+
+
+def _request_is_stateful():
+    # The base layout renders the auth nav and flashed messages, so a
+    # page rendered for a logged-in session or with a pending flash must
+    # never be stored in (or served from) the shared cache.
+    return current_user.is_authenticated or '_flashes' in session
+
+
+@app.route('/car/<int:car_id>')
+@cache.cached(timeout=300, unless=_request_is_stateful)
+def car_detail(car_id):
+    car = (
+        Car.query.options(*_loader_options(selectinload(Car.dealer)))
+        .filter_by(id=car_id)
+        .first()
+    )
+    if car is None:
+        abort(404)
+    response = make_response(render_template('car_detail.html', car=car))
+    response.headers['Vary'] = 'Cookie'
+    return response
+
+
+@app.route('/dealer/<int:user_id>')
+def dealer_page(user_id):
+    dealer = User.query.get_or_404(user_id)
+    after_id, limit = _page_args()
+    query = Car.query.options(
+        *_loader_options(selectinload(Car.dealer), defer(Car.description))
+    ).filter_by(user_id=user_id, is_sold=False)
+    if after_id:
+        query = query.filter(Car.id < after_id)
+    cars = query.order_by(Car.id.desc()).limit(limit).all()
+    next_url = _next_page_url('dealer_page', cars, limit, user_id=user_id)
+    return render_template('dealer.html', dealer=dealer, cars=cars, next_url=next_url)
+
+
+@app.route('/signup', methods=['GET', 'POST'])
+def signup():
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        password = request.form['password']
+        whatsapp_number = request.form.get('whatsapp_number', '').strip()
+        if user_by_username(username) is not None:
+            flash('Username already taken.')
+            return render_template('signup.html'), 400
+        user = User(username=username, whatsapp_number=whatsapp_number)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        login_user(user)
+        return redirect(url_for('dashboard'))
+    return render_template('signup.html')
+
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        password = request.form['password']
+        user = user_by_username(username)
+        if user is None or not user.check_password(password):
+            flash('Invalid username or password.')
+            return render_template('login.html'), 401
+        # check_password may have upgraded a legacy hash in place.
+        db.session.commit()
+        login_user(user)
+        return redirect(url_for('dashboard'))
+    return render_template('login.html')
+
+
+@app.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('index'))
+
+
+def dealer_stats(user_id):
+    """Listing counts and total value per sold-state, in one GROUP BY."""
+    rows = (
+        db.session.query(Car.is_sold, db.func.count(), db.func.sum(Car.price))
+        .filter(Car.user_id == user_id)
+        .group_by(Car.is_sold)
+        .all()
+    )
+    stats = {'for_sale': 0, 'for_sale_value': 0, 'sold': 0, 'sold_value': 0}
+    for is_sold, count, total in rows:
+        key = 'sold' if is_sold else 'for_sale'
+        stats[key] = count
+        stats[key + '_value'] = total or 0
+    return stats
+
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    # The listing is ordered by (is_sold, id desc), so the cursor carries
+    # both columns to keep the keyset filter aligned with the ordering.
+    after_id, limit = _page_args()
+    after_sold = request.args.get('after_sold', type=int)
+    query = Car.query.options(*_loader_options(defer(Car.description))).filter_by(
+        user_id=current_user.id
+    )
+    if after_id is not None and after_sold is not None:
+        same_group = db.and_(Car.is_sold == bool(after_sold), Car.id < after_id)
+        if after_sold:
+            query = query.filter(same_group)
+        else:
+            query = query.filter(db.or_(same_group, Car.is_sold == True))  # noqa: E712
+    cars = query.order_by(Car.is_sold, Car.id.desc()).limit(limit).all()
+    next_url = None
+    if len(cars) == limit:
+        args = request.args.to_dict()
+        args['after_id'] = cars[-1].id
+        args['after_sold'] = int(cars[-1].is_sold)
+        next_url = url_for('dashboard', **args)
+    stats = dealer_stats(current_user.id)
+    return render_template('dashboard.html', cars=cars, next_url=next_url, stats=stats)
+
+
+def _car_form_data():
+    """Coerce the listing form in one pass over request.form.
+
+    Validating up front keeps bad input out of the session entirely:
+    nothing is added or mutated before the numbers are known good.
+    Returns (kwargs, None) on success or (None, error message).
+    """
+    form = request.form.to_dict()
+    try:
+        return {
+            'make': form['make'].strip(),
+            'model': form['model'].strip(),
+            'year': int(form['year']),
+            'mileage': int(form['mileage']),
+            'price': float(form['price']),
+            'description': form.get('description', '').strip(),
+            'image_url': form.get('image_url', '').strip(),
+        }, None
+    except (KeyError, ValueError):
+        return None, 'Make, model, year, mileage and price are required; year, mileage and price must be numbers.'
+
+
+@app.route('/car/add', methods=['GET', 'POST'])
+@login_required
+def add_car():
+    if request.method == 'POST':
+        car_kwargs, error = _car_form_data()
+        if error:
+            flash(error)
+            return render_template('car_form.html', car=None), 400
+        # Core insert: the row goes straight to the database without
+        # unit-of-work bookkeeping, and nothing downstream needs the
+        # mapped object back.
+        db.session.execute(insert(Car).values(**car_kwargs, user_id=current_user.id))
+        db.session.commit()
+        flash('Listing added.')
+        return redirect(url_for('dashboard'))
+    return render_template('car_form.html', car=None)
+
+
+@app.route('/car/bulk_add', methods=['POST'])
+@login_required
+def bulk_add_cars():
+    """Batch import: a JSON array of listings becomes one executemany."""
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return {'error': 'expected a non-empty JSON array of listings'}, 400
+    rows = []
+    for item in items:
+        try:
+            rows.append({
+                'make': str(item['make']).strip(),
+                'model': str(item['model']).strip(),
+                'year': int(item['year']),
+                'mileage': int(item['mileage']),
+                'price': float(item['price']),
+                'description': str(item.get('description', '')).strip(),
+                'image_url': str(item.get('image_url', '')).strip(),
+                'user_id': current_user.id,
+            })
+        except (KeyError, TypeError, ValueError):
+            return {'error': f'invalid listing at index {len(rows)}'}, 400
+    db.session.execute(insert(Car), rows)
+    db.session.commit()
+    return {'added': len(rows)}, 201
+
+
+def _abort_missing_or_forbidden(car_id):
+    """Error path only: one extra SELECT to tell 404 from 403."""
+    exists = db.session.query(Car.id).filter_by(id=car_id).first()
+    abort(403 if exists else 404)
+
+
+def _owned_car_or_abort(car_id):
+    car = Car.query.get_or_404(car_id)
+    if car.user_id != current_user.id:
+        abort(403)
+    return car
+
+
+@app.route('/car/<int:car_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_car(car_id):
+    # Mutations fold the ownership check into the WHERE clause so the
+    # happy path is one UPDATE instead of SELECT-check-UPDATE; the car
+    # is only fetched when a form has to be rendered.
+    if request.method == 'POST':
+        car_kwargs, error = _car_form_data()
+        if error:
+            flash(error)
+            return render_template('car_form.html', car=_owned_car_or_abort(car_id)), 400
+        rows = Car.query.filter_by(id=car_id, user_id=current_user.id).update(
+            car_kwargs, synchronize_session=False
+        )
+        db.session.commit()
+        if not rows:
+            _abort_missing_or_forbidden(car_id)
+        _invalidate_car_cache(car_id)
+        flash('Listing updated.')
+        return redirect(url_for('dashboard'))
+    return render_template('car_form.html', car=_owned_car_or_abort(car_id))
+
+
+@app.route('/car/<int:car_id>/delete', methods=['POST'])
+@login_required
+def delete_car(car_id):
+    rows = Car.query.filter_by(id=car_id, user_id=current_user.id).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not rows:
+        _abort_missing_or_forbidden(car_id)
+    _invalidate_car_cache(car_id)
+    flash('Listing deleted.')
+    return redirect(url_for('dashboard'))
+
+
+@app.route('/car/<int:car_id>/sold', methods=['POST'])
+@login_required
+def mark_sold(car_id):
+    # The toggle happens in SQL, so the row never round-trips to Python.
+    rows = Car.query.filter_by(id=car_id, user_id=current_user.id).update(
+        {Car.is_sold: ~Car.is_sold}, synchronize_session=False
+    )
+    db.session.commit()
+    if not rows:
+        _abort_missing_or_forbidden(car_id)
+    _invalidate_car_cache(car_id)
+    return redirect(url_for('dashboard'))
+
+
+# The current year only matters at day granularity for depreciation, so
+# grab it at import and recheck at most once a day instead of asking the
+# clock on every request.
+_current_year = datetime.now().year
+_year_checked = time.monotonic()
+
+
+def current_year():
+    global _current_year, _year_checked
+    if time.monotonic() - _year_checked > 86400:
+        _current_year = datetime.now().year
+        _year_checked = time.monotonic()
+    return _current_year
+
+
+@functools.lru_cache(maxsize=4096)
+def _base_price(make_lower, model_lower):
+    # xxhash instead of builtin hash(): stable across interpreter
+    # restarts (hash() is seeded per process), so the same car always
+    # quotes the same base price and results can be cached externally.
+    return (
+        30000
+        + xxhash.xxh64_intdigest(make_lower.encode()) % 5000
+        + xxhash.xxh64_intdigest(model_lower.encode()) % 5000
+    )
+
+
+@cache.memoize(timeout=86400)
+def price_suggestion(make, model, year):
+    """Pure pricing function: the same car always quotes the same range.
+
+    The spread jitter comes from an RNG seeded with a stable hash of the
+    inputs, so quotes survive restarts and memoize cleanly.
+    """
+    age = max(0, current_year() - year)
+    depreciated = _base_price(make.lower(), model.lower()) * (0.85 ** age)
+    rng = random.Random(
+        xxhash.xxh64_intdigest(f'{make.lower()}|{model.lower()}|{year}'.encode())
+    )
+    return {
+        'make': make,
+        'model': model,
+        'year': year,
+        'low': int(depreciated - rng.randint(500, 1500)),
+        'high': int(depreciated + rng.randint(500, 1500)),
+    }
+
+
+@app.route('/suggest-price', methods=['GET', 'POST'])
+def suggest_price():
+    suggestion = None
+    if request.method == 'POST':
+        make = request.form.get('make', '').strip()
+        model = request.form.get('model', '').strip()
+        try:
+            year = int(request.form['year'])
+        except (KeyError, ValueError):
+            flash('Year must be a number.')
+            return render_template('suggest_price.html', suggestion=None), 400
+        suggestion = price_suggestion(make, model, year)
+    return render_template('suggest_price.html', suggestion=suggestion)
+
+
+with app.app_context():
+    db.create_all()
+    init_search_index()
+
+
+if __name__ == '__main__':
+    app.run(debug=True)